@@ -40,7 +40,7 @@ def safe_write(path: Path, content: str, make_executable: bool = False) -> bool:
     if path.exists():
         return False
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding="utf-8")
+    path.write_bytes(content.encode("utf-8"))  # no text layer: same LF bytes on every OS
     if make_executable and os.name != "nt":
         try:
             os.chmod(path, 0o755)
@@ -360,11 +360,7 @@ class FolderBootloader:
         reqs = self.project_root / "backend" / "requirements.txt"
         default_reqs = (
             "flask>=3.0,<4\n"
-            "werkzeug>=3.0,<4\n"
-            "jinja2>=3.1,<4\n"
             "markupsafe>=2.1,<3\n"
-            "blinker>=1.7,<2\n"
-            "itsdangerous>=2.1,<3\n"
         )
         if safe_write(reqs, default_reqs):
             self.logger.info("Created file: backend/requirements.txt")
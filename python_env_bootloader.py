@@ -3,227 +3,145 @@
 Python Env Bootloader (STEP 2)
 - Finds deployment root from VELA_CORE_DIR (or cwd)
 - Ensures backend/ with minimal Flask app (/api/health)
-- Creates backend/.venv
-- Ensures backend/requirements.txt (writes defaults if missing)
-- Upgrades pip tooling, installs requirements (uv if present → pip fallback)
-- Verifies imports (flask, werkzeug, jinja2, markupsafe, blinker)
-- Writes start_server.py / stop_servers.py at repo root
-- Optional --start-now to launch Flask (detached)
+- Ensures backend/requirements.txt lists Flask, MarkupSafe and flask-cors
+  (Flask's own metadata brings werkzeug/jinja2/itsdangerous/click/blinker)
+- Skips everything below when requirements + interpreter match the last install
+- Creates backend/.venv; opt-in --system installs into the running (non-venv)
+  Python instead (uv only)
+- uv on PATH: compiles a lock once per requirements content, then syncs it
+  (uv pip install --system in system mode) and runs uv pip check (venv only)
+- Otherwise pip: prefetches a wheelhouse while the venv builds, installs
+  --no-index from it (index as fallback), upgrades pip tooling only when stale
+- Verifies imports (flask, werkzeug, jinja2, markupsafe, blinker, click) on the
+  pip path and in system mode
+- Writes vela_spawn.py / start_flask.py / stop_flask.py at repo root
+- Optional --start-now to launch Flask (detached, straight from this process)
 """
 
 from __future__ import annotations
-import os, sys, subprocess, shutil, tempfile, time
+import os, re, sys, subprocess, shutil, hashlib, threading, queue, functools, types, sysconfig
 from pathlib import Path
-import argparse, textwrap, json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import argparse, json
 
+# top-level only: Flask's own metadata pins werkzeug/jinja2/itsdangerous/click/blinker,
+# so listing them again just hands the resolver more constraints to intersect
 MUST_HAVE = {
     "flask": "Flask>=3.0,<4",
-    "werkzeug": "Werkzeug>=3.0,<4",
-    "jinja2": "Jinja2>=3.1,<4",
-    "markupsafe": "MarkupSafe>=2.1.5,<3",
-    "itsdangerous": "itsdangerous>=2.1,<3",
-    "click": "click>=8.1,<9",
-    "blinker": "blinker>=1.7,<2",
-    "flask-cors": "flask-cors>=4.0,<5",
+    "markupsafe": "MarkupSafe>=2.1.5,<3",  # floor above what Jinja2 alone would accept
+    "flask-cors": "flask-cors>=4.0,<5",  # imported by the generated app/main.py
 }
+# leading project name of a requirement line (stops at any specifier, extra or marker)
+_REQ_NAME_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9_.\-]*)")
 
+IS_WIN = os.name == "nt"
+VENV_PY_REL = Path("Scripts/python.exe") if IS_WIN else Path("bin/python")
+VENV_PYW_REL = Path("Scripts/pythonw.exe") if IS_WIN else VENV_PY_REL  # no console window on Windows
+# Windows creationflags: CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW (+ DETACHED_PROCESS)
+WIN_NO_WINDOW_FLAGS = 0x00000200 | 0x08000000
 
-# ---------- helpers ----------
+# resolved once per process; uv short-circuits the whole pip bootstrap path
+UV_BIN = shutil.which("uv")
+USE_UV = UV_BIN is not None
 
-def resolve_deployment_root() -> Path:
-    core_dir = os.environ.get("VELA_CORE_DIR")
-    if core_dir:
-        p = Path(core_dir).resolve()
-        try:
-            return p.parents[3]  # …/data/.vela/cores/<vh> -> deployment root
-        except IndexError:
-            pass
-    return Path.cwd().resolve()
 
-def ensure_backend(root: Path) -> Path:
-    backend = root / "backend"
-    (backend / "app" / "routes").mkdir(parents=True, exist_ok=True)
-    (backend / "app" / "models").mkdir(parents=True, exist_ok=True)
-    (backend / "app" / "utils").mkdir(parents=True, exist_ok=True)
-
-    ini = backend / "app" / "__init__.py"
-    if not ini.exists():
-        ini.write_text("# Flask app init\n", encoding="utf-8")
-
-    main_py = backend / "app" / "main.py"
-    if not main_py.exists():
-        main_py.write_text(textwrap.dedent("""\
-            from flask import Flask, jsonify
-            from flask_cors import CORS
-
-            def create_app():
-                app = Flask(__name__)
-                CORS(app, resources={r"/api/*": {"origins": "*"}})
-
-                @app.get("/api/health")
-                def health():
-                    import time
-                    return jsonify({"status": "ok", "service": "backend", "ts": time.time()})
-
-                return app
-
-            if __name__ == "__main__":
-                app = create_app()
-                app.run(host="127.0.0.1", port=5000, debug=True)
-        """), encoding="utf-8")
-    return backend
-
-def write_requirements(requirements_path: Path) -> None:
-    requirements_path.parent.mkdir(parents=True, exist_ok=True)
-    if not requirements_path.exists():
-        # fresh file with all must-haves
-        requirements_path.write_text("\n".join(MUST_HAVE.values()) + "\n", encoding="utf-8")
-        return
-    # patch existing file to include any missing must-haves
-    existing = requirements_path.read_text(encoding="utf-8", errors="ignore").splitlines()
-    lower = {ln.strip().split("==")[0].split(">=")[0].split("<")[0].lower() for ln in existing if ln.strip() and not ln.strip().startswith("#")}
-    additions = [spec for name, spec in MUST_HAVE.items() if name not in lower]
-    if additions:
-        with requirements_path.open("a", encoding="utf-8") as f:
-            f.write("\n" + "\n".join(additions) + "\n")
+# ---------- templates (flush-left literals: no dedent at runtime) ----------
 
+_MAIN_PY_SRC = """\
+from flask import Flask, jsonify
+from flask_cors import CORS
 
-def create_venv(venv_dir: Path, env: dict) -> tuple[Path, str]:
-    venv_dir.mkdir(parents=True, exist_ok=True)
-    uv = shutil.which("uv")
-    if uv:
-        res = subprocess.run([uv, "venv", str(venv_dir)], capture_output=True, text=True, env=env)
-        if res.returncode != 0:
-            sys.stdout.write(res.stdout or ""); sys.stderr.write(res.stderr or "")
-            raise SystemError("uv venv failed")
-    else:
-        res = subprocess.run([sys.executable, "-m", "venv", str(venv_dir)], capture_output=True, text=True, env=env)
-        if res.returncode != 0:
-            sys.stdout.write(res.stdout or ""); sys.stderr.write(res.stderr or "")
-            raise SystemError("venv creation failed")
-    python_exe = str(venv_dir / ("Scripts/python.exe" if os.name == "nt" else "bin/python"))
-    return venv_dir, python_exe
+def create_app():
+    app = Flask(__name__)
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-def ensure_pip(python_exe: str, env: dict) -> None:
-    chk = subprocess.run([python_exe, "-m", "pip", "--version"], capture_output=True, text=True, env=env)
-    if chk.returncode == 0:
-        return
-    print("[STEP2] Bootstrapping pip via ensurepip ...")
-    ep = subprocess.run([python_exe, "-m", "ensurepip", "--upgrade"], capture_output=True, text=True, env=env)
-    sys.stdout.write(ep.stdout or ""); sys.stderr.write(ep.stderr or "")
-    chk = subprocess.run([python_exe, "-m", "pip", "--version"], capture_output=True, text=True, env=env)
-    if chk.returncode != 0:
-        raise SystemError("pip is unavailable in the virtual environment")
+    @app.get("/api/health")
+    def health():
+        import time
+        return jsonify({"status": "ok", "service": "backend", "ts": time.time()})
 
-def _stream_run(cmd, cwd=None, env=None, label=""):
-    """Run a command and stream stdout to our stdout (line-by-line)."""
-    lbl = f"[{label}] " if label else ""
-    print(f"{lbl}exec: {' '.join(map(str, cmd))} (cwd={cwd or os.getcwd()})", flush=True)
+    return app
 
-    creationflags = 0
-    if os.name == "nt":
-        DETACHED_PROCESS = 0x00000008
-        CREATE_NEW_PROCESS_GROUP = 0x00000200
-        CREATE_NO_WINDOW = 0x08000000
-        creationflags = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW  # we want a console for installs, but no new window
+if __name__ == "__main__":
+    app = create_app()
+    app.run(host="127.0.0.1", port=5000, debug=True)
+"""
 
-    p = subprocess.Popen(
-        cmd,
-        cwd=str(cwd) if cwd else None,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        creationflags=creationflags
-    )
-    assert p.stdout is not None
+# pip tooling below these floors gets upgraded alongside the requirements install
+TOOLING_FLOORS = {"pip": (24, 0), "setuptools": (70, 0), "wheel": (0, 43)}
+TOOLING_STALE_RC = 3
+# venv-relative marker: tooling met TOOLING_FLOORS last run, so skip the probe spawn;
+# its content keys the verdict to the floors and the interpreter that produced it
+BOOTSTRAP_OK_NAME = ".bootstrap_ok"
+BOOTSTRAP_OK_KEY = f"{TOOLING_FLOORS!r} {sys.version}"
+
+# pip probe: import, ensurepip fallback, re-import and tooling floor check in one
+# interpreter launch; exits TOOLING_STALE_RC when pip/setuptools/wheel need an upgrade
+_ENSURE_PIP_SRC = f"""\
+import importlib, re, sys
+from importlib.metadata import version, PackageNotFoundError
+try:
+    import pip
+except ImportError:
+    print("[STEP2] Bootstrapping pip via ensurepip ...", flush=True)
+    import ensurepip
+    ensurepip.bootstrap(upgrade=True)
+    importlib.invalidate_caches()
+    import pip
+print("pip", pip.__version__)
+stale = []
+for name, floor in {TOOLING_FLOORS!r}.items():
     try:
-        for line in iter(p.stdout.readline, ""):
-            print(f"{lbl}{line.rstrip()}", flush=True)
-    finally:
-        p.stdout.close()
-    rc = p.wait()
-    print(f"{lbl}exit code: {rc}", flush=True)
-    return rc
-
-def install_requirements(python_exe: str, requirements_path: Path, backend: Path, base_env: dict) -> int:
-    # 0) env hygiene
-    env = os.environ.copy()
-    env.update(base_env or {})
-    env.setdefault("PYTHONUNBUFFERED", "1")
-    env.setdefault("PIP_DISABLE_PIP_VERSION_CHECK", "1")
-    env.setdefault("UV_SYSTEM_PYTHON", "0")  # keep uv inside the venv
-
-    # 1) ensure pip tooling (inside venv)
-    rc = _stream_run([python_exe, "-m", "pip", "install", "-U", "pip", "setuptools", "wheel"],
-                     cwd=backend, env=env, label="pip")
-    if rc != 0:
-        return rc
-
-    # 2) prefer uv with explicit venv Python, else pip -r
-    uv = shutil.which("uv")
-    if uv:
-        print("[STEP2] Installing requirements with uv pip sync:", requirements_path)
-        _stream_run([python_exe, "-m", "pip", "install",
-                     "--disable-pip-version-check",
-                     "click>=8.1,<9", "flask-cors>=4,<5"],
-                    cwd=backend, env=env, label="pip")
-        return rc  # IMPORTANT: return directly; don't fall through
-    else:
-        print("[STEP2] Installing requirements with pip -r:", requirements_path)
-        rc = _stream_run([python_exe, "-m", "pip", "install", "-r", str(requirements_path)],
-                         cwd=backend, env=env, label="pip")
-        return rc
-
-
+        have = tuple(int(x) for x in re.findall(r"\\d+", version(name))[:len(floor)])
+    except PackageNotFoundError:
+        have = ()
+    if have < floor:
+        stale.append(name)
+if stale:
+    print("stale tooling:", ", ".join(stale))
+    sys.exit({TOOLING_STALE_RC})
+"""
 
+VERIFY_MODULES = ("flask", "werkzeug", "jinja2", "markupsafe", "blinker", "click")
 
-def verify_stack(python_exe: str, env: dict) -> None:
-    print("[STEP2] Verifying Flask stack imports ...")
-    verify_src = textwrap.dedent("""\
-        import importlib as i, json
-        mods=['flask','werkzeug','jinja2','markupsafe','blinker','click']
-        missing=[]; vers={}
-        for m in mods:
-            try:
-                mod=i.import_module(m)
-                vers[m]=getattr(mod,'__version__','?')
-            except Exception as e:
-                missing.append((m,str(e)))
-        print(json.dumps({'missing':missing,'versions':vers}))
-    """)
-    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".py") as tf:
-        tf.write(verify_src)
-        tf_path = tf.name
+_VERIFY_SRC = f"""\
+import importlib as i, json
+mods={list(VERIFY_MODULES)!r}
+missing=[]; vers={{}}
+for m in mods:
     try:
-        res = subprocess.run([python_exe, tf_path], capture_output=True, text=True, env=env)
-        if res.stdout:
-            print("[STEP2] Verify output:", res.stdout.strip())
-        if res.returncode != 0:
-            if res.stderr:
-                print("[STEP2] Verify stderr:", res.stderr.strip())
-            raise SystemError("import check failed")
-        payload = json.loads(res.stdout.strip() or "{}")
-        missing = payload.get("missing") or []
-        vers = payload.get("versions") or {}
-        print(f"[STEP2] Flask stack versions: {vers}")
-        if missing:
-            raise SystemError(f"Flask stack failed to import: MISSING:{missing}")
-    finally:
-        try: os.remove(tf_path)
-        except Exception: pass
+        mod=i.import_module(m)
+        vers[m]=getattr(mod,'__version__','?')
+    except Exception as e:
+        missing.append((m,str(e)))
+print(json.dumps({{'missing':missing,'versions':vers}}))
+"""
 
-def write_flask_scripts(root: Path) -> None:
-    run_dir = root / ".vela-run"
-    run_dir.mkdir(exist_ok=True)
+# shared by start_flask.py and start_flask_detached(): one copy of the detach logic
+_VELA_SPAWN_SRC = r"""import os, subprocess
 
-    start_flask = root / "start_flask.py"
-    stop_flask  = root / "stop_flask.py"
+# Windows: DETACHED_PROCESS | CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
+DETACHED_FLAGS = 0x00000008 | 0x00000200 | 0x08000000
 
-    start_flask.write_text(r"""#!/usr/bin/env python3
-import os, sys, time, subprocess
+def spawn_detached(py, code, cwd, log_path, env) -> int:
+    with open(log_path, "ab", buffering=0) as log:
+        # close_fds=True: the server is long-lived, so it must not keep whatever fds the
+        # deploy caller handed us (CI pipes, lock files). That rules out os.posix_spawn,
+        # which cannot close inherited fds, and costs the subprocess posix_spawn path
+        # (as do cwd and start_new_session): a one-off fork_exec per server start.
+        kwargs = dict(cwd=str(cwd), env=env, stdout=log, stderr=subprocess.STDOUT, close_fds=True)
+        if os.name == "nt":
+            kwargs["creationflags"] = DETACHED_FLAGS
+        else:
+            kwargs["start_new_session"] = True
+        return subprocess.Popen([py, "-c", code], **kwargs).pid
+"""
+
+_START_FLASK_SRC = r"""#!/usr/bin/env python3
+import os, sys, time, subprocess, threading, queue
 from pathlib import Path
+from vela_spawn import spawn_detached
 
 ROOT = Path(__file__).resolve().parent
 BACKEND = ROOT / "backend"
@@ -234,8 +152,18 @@ LOGF = BACKEND / "flask.log"
 def pid_alive(pid: int) -> bool:
     try:
         if os.name == "nt":
-            out = subprocess.run(["tasklist", "/FI", f"PID eq {pid}"], capture_output=True, text=True)
-            return str(pid) in out.stdout
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            PROCESS_QUERY_LIMITED_INFORMATION, STILL_ACTIVE = 0x1000, 259
+            h = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+            if not h:
+                return False
+            try:
+                code = ctypes.c_ulong()
+                # an exited-but-unreaped pid still opens: ask for its exit code
+                return bool(kernel32.GetExitCodeProcess(h, ctypes.byref(code))) and code.value == STILL_ACTIVE
+            finally:
+                kernel32.CloseHandle(h)
         else:
             os.kill(pid, 0)
             return True
@@ -243,16 +171,15 @@ def pid_alive(pid: int) -> bool:
         return False
 
 def read_pid():
-    try:
-        if PIDF.exists():
-            p = int(PIDF.read_text().strip())
-            if pid_alive(p): return p
-    except Exception:
+    try:  # one read, no exists() pre-check: a missing file is just OSError
+        p = int(PIDF.read_bytes())
+        if pid_alive(p): return p
+    except (OSError, ValueError):
         pass
     return None
 
 def write_pid(pid: int):
-    PIDF.write_text(str(pid), encoding="utf-8")
+    PIDF.write_bytes(b"%d" % pid)
 
 def venv_python() -> str:
     v = BACKEND / ".venv" / ("Scripts/pythonw.exe" if os.name=="nt" else "bin/python")
@@ -276,35 +203,39 @@ def start(detached: bool = True, host="127.0.0.1", port=5000):
     env["PYTHONUTF8"] = "1"
     env["PYTHONPATH"] = str(BACKEND)
 
-    kwargs = dict(cwd=str(BACKEND), env=env)
     if detached:
-        log = open(LOGF, "ab", buffering=0)
-        kwargs.update(stdout=log, stderr=subprocess.STDOUT, close_fds=True)
-        if os.name == "nt":
-            DETACHED_PROCESS = 0x00000008
-            CREATE_NEW_PROCESS_GROUP = 0x00000200
-            CREATE_NO_WINDOW = 0x08000000
-            kwargs["creationflags"] = DETACHED_PROCESS | CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
-        else:
-            kwargs["preexec_fn"] = os.setpgrp
-    else:
-        kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        pid = spawn_detached(py, code, BACKEND, LOGF, env)
+        write_pid(pid)
+        print(f"[flask] pid={pid} → http://{host}:{port}")
+        return pid
 
-    p = subprocess.Popen([py, "-c", code], **kwargs)
+    p = subprocess.Popen([py, "-c", code], cwd=str(BACKEND), env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
     write_pid(p.pid)
     print(f"[flask] pid={p.pid} → http://{host}:{port}")
-    if not detached and p.stdout:
-        for _ in range(30):
-            ln = p.stdout.readline()
-            if not ln: break
+    if p.stdout:
+        # echo startup output for a bounded wall time, never a blocking readline
+        q = queue.Queue()
+        def drain():
+            for ln in p.stdout:
+                q.put(ln)
+            q.put(None)
+        threading.Thread(target=drain, daemon=True).start()
+        deadline = time.monotonic() + 3.0
+        while (left := deadline - time.monotonic()) > 0:
+            try:
+                ln = q.get(timeout=left)
+            except queue.Empty:
+                break
+            if ln is None: break
             print("[flask]", ln.rstrip())
     return p.pid
 
 if __name__ == "__main__":
     start(detached=True)
-""", encoding="utf-8")
+"""
 
-    stop_flask.write_text(r"""#!/usr/bin/env python3
+_STOP_FLASK_SRC = r"""#!/usr/bin/env python3
 import os, subprocess
 from pathlib import Path
 
@@ -312,11 +243,26 @@ ROOT = Path(__file__).resolve().parent
 RUN  = ROOT / ".vela-run"
 PIDF = RUN / "flask.pid"
 
+def terminate_windows(pid: int) -> bool:
+    # TerminateProcess on one known pid: a syscall instead of spawning taskkill
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    PROCESS_TERMINATE = 0x0001
+    h = kernel32.OpenProcess(PROCESS_TERMINATE, False, pid)
+    if not h:
+        return False
+    try:
+        return bool(kernel32.TerminateProcess(h, 1))
+    finally:
+        kernel32.CloseHandle(h)
+
 def kill(pid: int):
     try:
         if os.name == "nt":
-            subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"], check=False,
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            # debug=False Flask is a single process; VELA_KILL_TREE=1 forces taskkill /T
+            if os.environ.get("VELA_KILL_TREE") == "1" or not terminate_windows(pid):
+                subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"], check=False,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         else:
             os.kill(pid, 15)
     except Exception:
@@ -325,7 +271,7 @@ def kill(pid: int):
 if __name__ == "__main__":
     if PIDF.exists():
         try:
-            pid = int(PIDF.read_text().strip())
+            pid = int(PIDF.read_bytes())
             print(f"[flask] stopping pid={pid} …")
             kill(pid)
         except Exception:
@@ -333,65 +279,557 @@ if __name__ == "__main__":
         PIDF.unlink(missing_ok=True)
     else:
         print("[flask] no pid file")
-""", encoding="utf-8")
-
-    for f in (start_flask, stop_flask):
-        try: os.chmod(f, 0o755)
-        except Exception: pass
+"""
 
+# generated scripts are fixed text: encode once here, not on every deploy
+_VELA_SPAWN_BYTES, _START_FLASK_BYTES, _STOP_FLASK_BYTES = (
+    src.encode("utf-8") for src in (_VELA_SPAWN_SRC, _START_FLASK_SRC, _STOP_FLASK_SRC))
+
+
+# ---------- layout ----------
+
+@dataclass(frozen=True, slots=True)
+class Layout:
+    """Every path the bootloader touches, resolved once in main()."""
+    root: Path
+    backend: Path
+    venv: Path
+    python_exe: str
+    pythonw_exe: str
+    reqs: Path
+    run_dir: Path
+    pid_file: Path
+    log_file: Path
+    system: bool = False  # install into the host interpreter; venv is then sys.prefix
+    state_dir: Path | None = None  # where install stamps live (the venv, or run_dir for --system)
+
+    @classmethod
+    def build(cls, root: Path, venv_dir: str, requirements: str, system: bool = False) -> "Layout":
+        reqs = Path(requirements) if Path(requirements).is_absolute() else (root / requirements).resolve()
+        backend = root / "backend"
+        run_dir = root / ".vela-run"
+        if system:
+            venv, python_exe = Path(sys.prefix), sys.executable
+            pythonw_exe = python_exe
+        else:
+            venv = Path(venv_dir) if Path(venv_dir).is_absolute() else (root / venv_dir).resolve()
+            python_exe, pythonw_exe = str(venv / VENV_PY_REL), str(venv / VENV_PYW_REL)
+        return cls(
+            root=root,
+            backend=backend,
+            venv=venv,
+            python_exe=python_exe,
+            pythonw_exe=pythonw_exe,
+            reqs=reqs,
+            run_dir=run_dir,
+            pid_file=run_dir / "flask.pid",  # same file start/stop_flask.py use
+            log_file=backend / "flask.log",
+            system=system,
+            state_dir=run_dir if system else venv,  # sys.prefix may not be ours to write
+        )
 
-def start_flask_detached(backend: Path, venv_path: Path, env: dict, host="127.0.0.1", port=5000):
-    # prefer pythonw.exe on Windows to avoid console window
-    if os.name == "nt":
-        pyw = venv_path / "Scripts" / "pythonw.exe"
-        python_exe = str(pyw if pyw.exists() else venv_path / "Scripts" / "python.exe")
-    else:
-        python_exe = str(venv_path / "bin" / "python")
 
-    log_file = backend / "flask.log"
-    pid_file = backend / "flask.pid"
+# ---------- helpers ----------
 
-    code = (
-        "from app.main import create_app; "
-        "app=create_app(); "
-        f"app.run(host='{host}', port={port}, debug=False)"
-    )
-    cmd = [python_exe, "-c", code]
+def cache_root() -> Path:
+    """Per-user cache shared by every deployment (XDG_CACHE_HOME / %LOCALAPPDATA%)."""
+    base = os.environ.get("XDG_CACHE_HOME") or (os.environ.get("LOCALAPPDATA") if IS_WIN else None)
+    return (Path(base) if base else Path.home() / ".cache") / "vela"
+
+def _run(cmd, **kw) -> subprocess.CompletedProcess:
+    """subprocess.run that keeps CPython's posix_spawn fast path: close_fds=False is
+    safe because our own fds are non-inheritable (PEP 446)."""
+    if not IS_WIN and "preexec_fn" not in kw and "pass_fds" not in kw:
+        kw.setdefault("close_fds", False)
+    return subprocess.run(cmd, **kw)
+
+@functools.lru_cache(maxsize=1)
+def child_env() -> types.MappingProxyType:
+    """One read-only env snapshot for every child (unbuffered + saner pip/uv).
+    Callers needing overrides build `{**child_env(), "KEY": val}`."""
+    return types.MappingProxyType({
+        "PYTHONIOENCODING": "utf-8",
+        "PYTHONUNBUFFERED": "1",
+        "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+        "UV_SYSTEM_PYTHON": "0",  # keep uv inside the venv
+        **os.environ,  # last, so user-set values win (setdefault semantics)
+    })
+
+@functools.lru_cache(maxsize=1)
+def resolve_deployment_root() -> Path:
+    core_dir = os.environ.get("VELA_CORE_DIR")
+    if core_dir:
+        # …/data/.vela/cores/<vh> -> deployment root: four dirname hops on a str,
+        # abspath (no realpath stats); reaching the fs root early means "too shallow"
+        p = os.path.abspath(core_dir)
+        for _ in range(4):
+            parent = os.path.dirname(p)
+            if parent == p:
+                break
+            p = parent
+        else:
+            return Path(p)
+    return Path.cwd().resolve()
 
-    lf = open(log_file, "ab", buffering=0)
-    kwargs = dict(cwd=str(backend), stdout=lf, stderr=subprocess.STDOUT, close_fds=True, env=env)
+def write_new(path: Path, content: str) -> bool:
+    """Create path with content unless it already exists (EAFP: one open, no stat)."""
+    try:
+        with path.open("x", encoding="utf-8") as f:
+            f.write(content)
+    except FileExistsError:
+        return False
+    return True
 
-    if os.name == "nt":
-        DETACHED_PROCESS = 0x00000008
-        CREATE_NEW_PROCESS_GROUP = 0x00000200
-        CREATE_NO_WINDOW = 0x08000000
-        kwargs["creationflags"] = DETACHED_PROCESS | CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
-    else:
-        kwargs["preexec_fn"] = os.setpgrp
+def write_if_changed(path: Path, content: str | bytes) -> bool:
+    """Atomically (re)write path only when its bytes differ. Returns True if written."""
+    new = content if isinstance(content, bytes) else content.encode("utf-8")
+    try:
+        if path.read_bytes() == new:
+            return False
+    except FileNotFoundError:
+        pass
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(new)
+    os.replace(tmp, path)  # never leaves a half-written script behind
+    return True
+
+def _materialize_tree(specs: list[tuple[Path, str | None]]) -> None:
+    """Create a scaffold in one pass. specs are (dir, None) or (file, content);
+    the shared prefix is made once with parents=True, leaves directly under it
+    with a single mkdir each, then files are created only if absent (write_new)."""
+    dirs = {p if content is None else p.parent for p, content in specs}
+    base = Path(os.path.commonpath(dirs))
+    base.mkdir(parents=True, exist_ok=True)
+    for d in dirs:
+        if d != base and not any(d in o.parents for o in dirs):
+            d.mkdir(parents=d.parent != base, exist_ok=True)
+    for p, content in specs:
+        if content is not None:
+            write_new(p, content)
 
-    proc = subprocess.Popen(cmd, **kwargs)
-    pid_file.write_text(str(proc.pid), encoding="utf-8")
-    print(f"[start] Flask dev server (detached) pid={proc.pid} -> http://{host}:{port}")
-    print(f"[start] Logs: {log_file}")
-    return proc.pid
+def ensure_backend(root: Path) -> Path:
+    backend = root / "backend"
+    app = backend / "app"
+    sentinel = app / ".bootstrapped"
+    if sentinel.exists():
+        return backend  # warm path: one stat instead of re-walking the tree
+    _materialize_tree([
+        (app / "routes", None),
+        (app / "models", None),
+        (app / "utils", None),
+        (app / "__init__.py", "# Flask app init\n"),
+        (app / "main.py", _MAIN_PY_SRC),
+    ])
+    sentinel.touch()
+    return backend
 
-def stop_flask_if_any(backend_dir: Path):
-    pid_file = backend_dir / "flask.pid"
-    if not pid_file.exists():
+def write_requirements(requirements_path: Path) -> None:
+    requirements_path.parent.mkdir(parents=True, exist_ok=True)
+    # fresh file with all must-haves
+    if write_new(requirements_path, "\n".join(MUST_HAVE.values()) + "\n"):
         return
+    # patch existing file to include any missing must-haves
+    # stream the lines straight into the regex: no whole-file string or line list
+    with requirements_path.open(encoding="utf-8", errors="ignore") as f:
+        present = frozenset(m.group(1).lower() for ln in f if (m := _REQ_NAME_RE.match(ln)))
+    additions = [spec for name, spec in MUST_HAVE.items() if name not in present]
+    if additions:
+        with requirements_path.open("a", encoding="utf-8") as f:
+            f.write("\n")  # the file may not end in a newline
+            f.writelines(f"{spec}\n" for spec in additions)
+
+
+@functools.lru_cache(maxsize=1)
+def host_pip() -> list[str] | None:
+    """pip >= 22.3 on the host can drive a pip-less venv via `pip --python`, so new
+    venvs skip seeding pip entirely. None when the host pip is missing or older."""
     try:
-        pid = int(pid_file.read_text().strip())
+        from importlib.metadata import version
+        if tuple(int(x) for x in version("pip").split(".")[:2]) >= (22, 3):
+            return [sys.executable, "-m", "pip"]
     except Exception:
+        pass
+    return None
+
+def system_python_refusal() -> str | None:
+    """Why --system can't install into the interpreter running us (None if it can).
+    Opt-in only: the caller vouches that this Python is the deployment's own."""
+    if not USE_UV:
+        return "--system needs uv on PATH"
+    if sys.prefix != sys.base_prefix:
+        return f"running inside a virtualenv ({sys.prefix}), not a system Python"
+    if os.path.exists(os.path.join(sysconfig.get_path("stdlib"), "EXTERNALLY-MANAGED")):
+        return "this Python is externally managed (PEP 668)"
+    if not os.access(sysconfig.get_path("purelib"), os.W_OK):
+        return f"site-packages is not writable: {sysconfig.get_path('purelib')}"
+    return None
+
+def create_venv(layout: Layout, env: dict, verbose: bool = False) -> None:
+    if layout.system:
+        return
+    venv_dir = layout.venv
+    # an existing venv is reused as-is; ensure_pip / install bring it up to date
+    if (venv_dir / "pyvenv.cfg").exists() and Path(layout.python_exe).exists():
+        print(f"[STEP2] Reusing existing venv: {venv_dir}")
         return
+    venv_dir.mkdir(parents=True, exist_ok=True)
+    if USE_UV:
+        # pin uv to our interpreter: prefetch() resolves the lock against it concurrently
+        if _stream_run([UV_BIN, "venv", "--python", sys.executable, str(venv_dir)],
+                       env=env, label="uv", verbose=verbose) != 0:
+            raise SystemError("uv venv failed")
+    else:
+        cmd = [sys.executable, "-m", "venv", str(venv_dir)]
+        if host_pip():
+            cmd.insert(3, "--without-pip")  # no ensurepip seeding: the host pip installs into it
+        if _stream_run(cmd, env=env, label="venv", verbose=verbose) != 0:
+            raise SystemError("venv creation failed")
+
+def ensure_pip(layout: Layout, env: dict) -> bool:
+    """Make sure pip exists in the venv. Returns True when pip/setuptools/wheel
+    already meet TOOLING_FLOORS (so the upgrade round-trip can be skipped)."""
     try:
-        if os.name == "nt":
-            subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"], check=False)
-        else:
-            os.kill(pid, 15)
+        if (layout.venv / BOOTSTRAP_OK_NAME).read_text(encoding="utf-8") == BOOTSTRAP_OK_KEY:
+            return True  # stamped by an earlier run against the same floors: no spawn
+    except OSError:
+        pass
+    if (Path(layout.python_exe).parent / ("pip.exe" if IS_WIN else "pip")).exists():
+        # pip is there (one stat, no interpreter start); floors unknown, so let the
+        # install fold the tooling upgrade into its single pip invocation
+        return False
+    # returncode-only probe: inherit our stdio rather than allocating capture pipes
+    rc = _run([layout.python_exe, "-c", _ENSURE_PIP_SRC], env=env).returncode
+    if rc == TOOLING_STALE_RC:
+        return False
+    if rc != 0:
+        raise SystemError("pip is unavailable in the virtual environment")
+    mark_bootstrap_ok(layout.venv)
+    return True
+
+def mark_bootstrap_ok(venv_dir: Path) -> None:
+    write_if_changed(venv_dir / BOOTSTRAP_OK_NAME, BOOTSTRAP_OK_KEY)
+
+POLL_INTERVAL = 0.15
+READ_CHUNK = 65536
+
+def _iter_output(p: subprocess.Popen):
+    """Yield batches of raw output lines (bytes, no newline) of p.
+
+    A daemon thread drains the pipe so the child never stalls on a full pipe
+    buffer while we print. Stops at EOF, or once the child has exited and
+    nothing arrived within POLL_INTERVAL (a grandchild holding the pipe open
+    can't hang us).
+
+    The thread reads from its own dup of the pipe and closes it at EOF: when we
+    stop early, the caller's p.stdout.close() must not free an fd number the
+    still-blocked thread would then read from once the next pipe reuses it."""
+    q: queue.Queue = queue.Queue()
+    fd = os.dup(p.stdout.fileno())
+    def drain():
+        try:
+            while chunk := os.read(fd, READ_CHUNK):
+                q.put(chunk)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+            q.put(None)
+    threading.Thread(target=drain, daemon=True).start()
+
+    buf = b""
+    while True:
+        try:
+            chunk = q.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if p.poll() is not None:
+                break
+            continue
+        if chunk is None:
+            break
+        *lines, buf = (buf + chunk).split(b"\n")
+        if lines:
+            yield [raw.rstrip() for raw in lines]
+    if buf:
+        yield [buf.rstrip()]
+
+def _stream_run(cmd, cwd=None, env=None, label="", verbose=True):
+    """Run a command and stream stdout to our stdout with a [label] prefix.
+    verbose=False lets the child write to our stdio directly: no pipe, no relay."""
+    lbl = f"[{label}] " if label else ""
+    print(f"{lbl}exec: {' '.join(map(str, cmd))} (cwd={cwd or os.getcwd()})", flush=True)
+
+    if not verbose:
+        # no CREATE_NO_WINDOW here: the child must keep our console to write to it
+        rc = _run(cmd, cwd=str(cwd) if cwd else None, env=env).returncode
+        print(f"{lbl}exit code: {rc}", flush=True)
+        return rc
+
+    creationflags = WIN_NO_WINDOW_FLAGS if IS_WIN else 0  # we want a console for installs, but no new window
+
+    p = subprocess.Popen(
+        cmd,
+        cwd=str(cwd) if cwd else None,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        close_fds=IS_WIN,  # POSIX: same posix_spawn fast path as _run
+        creationflags=creationflags
+    )
+    assert p.stdout is not None
+    # pass child bytes straight through: one write + flush per read, no per-line decode
+    out = getattr(sys.stdout, "buffer", None)
+    prefix = lbl.encode("utf-8")
+    try:
+        for lines in _iter_output(p):
+            if out is None:
+                print("\n".join(lbl + raw.decode("utf-8", errors="replace") for raw in lines), flush=True)
+            else:
+                out.write(b"".join(prefix + raw + b"\n" for raw in lines))
+                out.flush()
     finally:
-        try: pid_file.unlink(missing_ok=True)
+        p.stdout.close()
+    rc = p.wait()
+    print(f"{lbl}exit code: {rc}", flush=True)
+    return rc
+
+def _reqs_digest(requirements_path: Path) -> str:
+    """Raw bytes of requirements.txt (edits invalidate) plus interpreter and platform,
+    since pins and wheel tags differ across both."""
+    key = requirements_path.read_bytes() + sys.version.encode() + sys.platform.encode()
+    return hashlib.sha256(key).hexdigest()[:12]
+
+def lock_path_for(requirements_path: Path, run_dir: Path) -> Path:
+    return run_dir / f"requirements.{_reqs_digest(requirements_path)}.lock"
+
+WHEELHOUSE_DONE = ".complete"
+
+def wheelhouse_for(requirements_path: Path, run_dir: Path) -> Path:
+    """Per-digest wheelhouse: an edited requirements.txt gets a fresh one."""
+    return run_dir / f"wheels.{_reqs_digest(requirements_path)}"
+
+INSTALL_STAMP_NAME = ".requirements.sha256"
+
+def install_digest(layout: Layout) -> str:
+    """Identity of an installed venv: requirements bytes, the host interpreter and
+    the venv interpreter (path + mtime, so a rebuilt or relinked venv re-installs).
+    lstat, not stat: bin/python is a symlink, and following it would only ever see
+    the base interpreter's mtime, which survives a venv rebuild."""
+    try:
+        mtime = os.lstat(layout.python_exe).st_mtime_ns
+    except OSError:
+        mtime = 0  # no venv yet: can't match any stamp
+    key = (layout.reqs.read_bytes() + sys.version.encode()
+           + layout.python_exe.encode() + str(mtime).encode())
+    return hashlib.sha256(key).hexdigest()
+
+def install_is_current(layout: Layout) -> bool:
+    try:
+        return (layout.state_dir / INSTALL_STAMP_NAME).read_text(encoding="utf-8") == install_digest(layout)
+    except OSError:
+        return False
+
+def prefetch_wheels(python_exe: str, requirements_path: Path, wheelhouse: Path, env: dict) -> None:
+    """Download the full wheel closure of requirements.txt (plus pip tooling) while
+    the venv is being built. Only a run that finishes marks the wheelhouse complete;
+    install_requirements serves a complete one with --no-index."""
+    if (wheelhouse / WHEELHOUSE_DONE).exists():
+        return
+    for stale in wheelhouse.parent.glob("wheels*"):
+        if stale != wheelhouse:
+            shutil.rmtree(stale, ignore_errors=True)  # built for other requirements
+    wheelhouse.mkdir(parents=True, exist_ok=True)
+    print(f"[STEP2] Prefetching wheels into {wheelhouse}")
+    # one resolver pass over the whole file: per-spec --no-deps downloads would leave
+    # the transitive wheels to the index
+    rc = _run([python_exe, "-m", "pip", "download", "--only-binary=:all:", "--disable-pip-version-check",
+               "-d", str(wheelhouse), "-r", str(requirements_path), "pip", "setuptools", "wheel"],
+              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env).returncode
+    if rc == 0:
+        (wheelhouse / WHEELHOUSE_DONE).touch()
+    else:
+        # not fatal: the install just uses the index
+        print("[STEP2] Prefetch incomplete; installing from the index")
+
+def compile_lock(layout: Layout, env, verbose: bool = False) -> int:
+    """uv: resolve once per requirements.txt content; later deploys sync straight from the lock.
+    Targets the host interpreter (the one the venv is built from), so no venv is needed yet."""
+    lock_path = lock_path_for(layout.reqs, layout.run_dir)
+    if lock_path.exists():
+        return 0
+    print("[STEP2] Resolving requirements with uv pip compile:", layout.reqs)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    rc = _stream_run([UV_BIN, "pip", "compile", "--python", sys.executable,
+                      str(layout.reqs), "-o", str(lock_path)],
+                     env=env, label="uv", verbose=verbose)  # no cwd: backend/ may still be in the making
+    if rc != 0:
+        lock_path.unlink(missing_ok=True)
+    return rc
+
+def prefetch(layout: Layout, env, verbose: bool = False) -> int:
+    """Network-bound half of the install. Needs no venv, so main() runs it
+    while create_venv builds one."""
+    if USE_UV:
+        return compile_lock(layout, env, verbose)
+    # host pip does the downloading; failures only cost the cache hit
+    prefetch_wheels(sys.executable, layout.reqs, wheelhouse_for(layout.reqs, layout.run_dir), env)
+    return 0
+
+def install_requirements(layout: Layout, env, upgrade_tooling: bool = True, verbose: bool = False) -> int:
+    # no cwd anywhere below: --python / the venv interpreter pin the target
+    python_exe, requirements_path = layout.python_exe, layout.reqs
+    # prefer uv with explicit venv Python (own resolver; no pip tooling needed), else pip -r
+    if USE_UV:
+        rc = compile_lock(layout, env, verbose)  # no-op when prefetch() already produced it
+        if rc != 0:
+            return rc
+        lock_path = lock_path_for(requirements_path, layout.run_dir)
+        if layout.system:
+            # additive only: sync would uninstall whatever else the host interpreter carries
+            print("[STEP2] Installing requirements into the system Python with uv:", lock_path)
+            sync = [UV_BIN, "pip", "install", "--system", "--python", python_exe, "-r", str(lock_path)]
+        else:
+            print("[STEP2] Installing requirements with uv pip sync:", lock_path)
+            sync = [UV_BIN, "pip", "sync", "--python", python_exe, str(lock_path)]
+        # warm cache: --offline links every pinned wheel without revalidating the index
+        # (UV_LINK_MODE=hardlink from main()); a cache miss just retries online
+        rc = _stream_run(sync + ["--offline"], env=env, label="uv", verbose=verbose)
+        if rc != 0:
+            print("[STEP2] uv cache incomplete; syncing online")
+            rc = _stream_run(sync, env=env, label="uv", verbose=verbose)
+        if rc != 0:
+            return rc
+        if layout.system:
+            # pip check would judge every package on the host, not just ours: main()
+            # runs the import check on the stack instead
+            return 0
+        # uv pip check only parses installed METADATA; stands in for verify_stack
+        return _stream_run([UV_BIN, "pip", "check", "--python", python_exe],
+                           env=env, label="uv", verbose=verbose)
+    else:
+        wheelhouse = wheelhouse_for(requirements_path, layout.run_dir)  # filled by prefetch()
+        lock_path = lock_path_for(requirements_path, layout.run_dir)
+        # one resolver pass: pip tooling upgrade + requirements in a single invocation;
+        # --no-compile skips the serial .pyc pass (Python compiles lazily on first import)
+        pip = [*host_pip(), "--python", python_exe] if host_pip() else [python_exe, "-m", "pip"]
+        # --no-input: never hang on a prompt; --disable-pip-version-check: no PyPI self-update probe
+        cmd = [*pip, "install", "--no-compile", "--no-input", "--disable-pip-version-check"]
+        # wheels over sdists even when an sdist is newer: no build step, no compiler needed
+        # (MarkupSafe's C speedups on fresh Pythons); sdist-only projects still install
+        cmd.append("--prefer-binary")
+        if upgrade_tooling and not host_pip():
+            cmd += ["--upgrade", "pip", "setuptools", "wheel"]
+
+        def pip_install(args: list[str]) -> int:
+            # a complete wheelhouse for these exact requirements needs no index at all;
+            # anything it lacks (e.g. sdist-only projects) retries against the index
+            if (wheelhouse / WHEELHOUSE_DONE).exists():
+                rc = _stream_run(cmd + ["--no-index", "--find-links", str(wheelhouse), *args],
+                                 env=env, label="pip", verbose=verbose)
+                if rc == 0:
+                    return 0
+                print("[STEP2] Wheelhouse install failed; retrying against the index")
+            return _stream_run(cmd + args, env=env, label="pip", verbose=verbose)
+
+        if lock_path.exists():
+            # fully pinned closure from an earlier resolve: nothing left for the resolver
+            print("[STEP2] Installing pinned requirements with pip --no-deps:", lock_path)
+            return pip_install(["--no-deps", "-r", str(lock_path)])
+        print("[STEP2] Installing requirements with pip -r:", requirements_path)
+        rc = pip_install(["-r", str(requirements_path)])
+        if rc == 0:
+            freeze = _run([*pip, "freeze", "--exclude-editable"],
+                          capture_output=True, text=True, env=env)
+            if freeze.returncode == 0 and freeze.stdout.strip():
+                write_if_changed(lock_path, freeze.stdout)
+        return rc
+
+def needs_import_check() -> bool:
+    """uv install + `uv pip check` already vouch for the env; only the pip
+    fallback (and Windows + Py3.13, where MarkupSafe wheels lag) still import."""
+    if not USE_UV:
+        return True
+    return IS_WIN and sys.version_info[:2] >= (3, 13)
+
+def _verify_in_process() -> dict:
+    """Same check as _VERIFY_SRC, for when we already run inside the target venv."""
+    import importlib
+    importlib.invalidate_caches()  # the install may have just added these to sys.path dirs
+    missing, vers = [], {}
+    for m in VERIFY_MODULES:
+        try:
+            vers[m] = getattr(importlib.import_module(m), "__version__", "?")
+        except Exception as e:
+            missing.append((m, str(e)))
+    return {"missing": missing, "versions": vers}
+
+def verify_stack(layout: Layout, env: dict) -> None:
+    print("[STEP2] Verifying Flask stack imports ...")
+    # compare prefixes, not executables: a venv python resolves to the base interpreter
+    if Path(sys.prefix).resolve() == layout.venv.resolve():
+        payload = _verify_in_process()
+    else:
+        res = _run([layout.python_exe, "-c", _VERIFY_SRC], capture_output=True, text=True, env=env)
+        if res.returncode != 0:
+            if res.stderr:
+                print("[STEP2] Verify stderr:", res.stderr.strip())
+            raise SystemError("import check failed")
+        # the status JSON is always the child's last line; anything above it is import noise
+        noise, _, status = res.stdout.rstrip().rpartition("\n")
+        if noise.strip():
+            print("[STEP2] Verify output:", noise.strip())
+        try:
+            payload = json.loads(status)
+        except ValueError:
+            raise SystemError(f"import check returned no status: {res.stdout.strip()!r}") from None
+    missing = payload.get("missing") or []
+    vers = payload.get("versions") or {}
+    print(f"[STEP2] Flask stack versions: {vers}")
+    if missing:
+        raise SystemError(f"Flask stack failed to import: MISSING:{missing}")
+
+def write_flask_scripts(root: Path) -> None:
+    run_dir = root / ".vela-run"
+    run_dir.mkdir(exist_ok=True)
+
+    start_flask = root / "start_flask.py"
+    stop_flask  = root / "stop_flask.py"
+
+    write_if_changed(root / "vela_spawn.py", _VELA_SPAWN_BYTES)
+    write_if_changed(start_flask, _START_FLASK_BYTES)
+
+    write_if_changed(stop_flask, _STOP_FLASK_BYTES)
+
+    for f in (start_flask, stop_flask):
+        try:
+            if f.stat().st_mode & 0o777 != 0o755:  # no-op reruns leave the inode untouched
+                os.chmod(f, 0o755)
         except Exception: pass
 
+
+def load_spawn_helper(root: Path):
+    """Import the vela_spawn.py written by write_flask_scripts (not on sys.path here)."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("vela_spawn", root / "vela_spawn.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+def start_flask_detached(layout: Layout, env: dict, host="127.0.0.1", port=5000):
+    # prefer pythonw.exe on Windows to avoid console window
+    python_exe = layout.pythonw_exe if Path(layout.pythonw_exe).exists() else layout.python_exe
+    log_file, pid_file = layout.log_file, layout.pid_file
+
+    code = (
+        "from app.main import create_app; "
+        "app=create_app(); "
+        f"app.run(host='{host}', port={port}, debug=False)"
+    )
+    pid = load_spawn_helper(layout.root).spawn_detached(python_exe, code, layout.backend, log_file, env)
+    pid_file.write_bytes(b"%d" % pid)
+    print(f"[start] Flask dev server (detached) pid={pid} -> http://{host}:{port}")
+    print(f"[start] Logs: {log_file}")
+    return pid
+
 # ---------- main ----------
 
 def main() -> int:
@@ -401,6 +839,8 @@ def main() -> int:
     ap.add_argument("--venv-dir", default="backend/.venv")
     ap.add_argument("--requirements", default="backend/requirements.txt")
     ap.add_argument("--start-now", action="store_true", help="Start Flask after install")
+    ap.add_argument("--system", action="store_true",
+                    help="Install into this (non-venv) Python with uv instead of backend/.venv")
     args, _ = ap.parse_known_args()
 
     root = resolve_deployment_root()
@@ -408,42 +848,74 @@ def main() -> int:
         print(f"[STEP2] deployment_root={root}")
         print(f"[STEP2] argv={sys.argv}")
 
-    # one env for all children (unbuffered + saner pip/uv)
-    env = os.environ.copy()
-    env.setdefault("PYTHONIOENCODING", "utf-8")
-    env.setdefault("PYTHONUNBUFFERED", "1")
-    env.setdefault("PIP_DISABLE_PIP_VERSION_CHECK", "1")
-    env.setdefault("UV_SYSTEM_PYTHON", "1")
-
-    backend = ensure_backend(root)
-
-    venv_dir = (root / args.venv_dir).resolve() if not Path(args.venv_dir).is_absolute() else Path(args.venv_dir)
-    reqs_path = (root / args.requirements).resolve() if not Path(args.requirements).is_absolute() else Path(args.requirements)
+    system = args.system
+    if system and (why := system_python_refusal()):
+        print(f"[STEP2] Ignoring --system: {why}; using a venv")
+        system = False
+    layout = Layout.build(root, args.venv_dir, args.requirements, system)
+    env = child_env()
+    if USE_UV:
+        # reuse unpacked wheels across deploys with zero-copy links; user-set values win
+        env = {
+            "UV_LINK_MODE": "hardlink",
+            "UV_CACHE_DIR": str(cache_root() / "uv"),
+            "UV_CONCURRENT_DOWNLOADS": "16",
+            "UV_CONCURRENT_INSTALLS": str(os.cpu_count() or 4),
+            **env,
+        }
+    else:
+        env = {"PIP_CACHE_DIR": str(cache_root() / "pip"), **env}
 
     try:
-        write_requirements(reqs_path)
-
-        venv_path, python_exe = create_venv(venv_dir, env)
-        ensure_pip(python_exe, env)
-
+        write_requirements(layout.reqs)
         if args.verbose:
-            print(f"[STEP2] venv={venv_path}")
-            print(f"[STEP2] python={python_exe}")
-            print(f"[STEP2] requirements={reqs_path}")
-
-        rc = install_requirements(python_exe, reqs_path, backend, base_env=env)
-        if rc != 0:
-            print("[STEP2] ERROR: dependency install failed")
-            return 1
-
-        verify_stack(python_exe, env)
-        write_flask_scripts(root)
-
-        print(f"[STEP2] Backend venv ready: {venv_path}")
-        print(f"[STEP2] Requirements installed from: {reqs_path}")
+            print(f"[STEP2] venv={layout.venv}")
+            print(f"[STEP2] python={layout.python_exe}")
+            print(f"[STEP2] requirements={layout.reqs}")
+
+        if install_is_current(layout):
+            # same requirements + interpreter as the last verified install: no venv work and
+            # no pool; what is left is sentinel/compare-guarded, i.e. a handful of stats
+            print("[STEP2] Requirements unchanged since last install; skipping")
+            ensure_backend(root)
+            write_flask_scripts(root)
+        else:
+            # backend scaffolding and resolution/downloads need no venv: overlap them with it
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                f_backend = pool.submit(ensure_backend, root)
+                f_prefetch = pool.submit(prefetch, layout, env, args.verbose)
+                create_venv(layout, env, args.verbose)
+                f_backend.result()
+                if f_prefetch.result() != 0:
+                    print("[STEP2] ERROR: dependency resolution failed")
+                    return 1
+
+            tooling_ok = True
+            if not USE_UV and not host_pip():
+                tooling_ok = ensure_pip(layout, env)  # uv / host pip install without pip in the venv
+
+            # script writing has no dependency on the venv: hide it under the install
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                f_install = pool.submit(install_requirements, layout, env,
+                                        upgrade_tooling=not tooling_ok, verbose=args.verbose)
+                f_scripts = pool.submit(write_flask_scripts, root)
+                rc = f_install.result()
+                f_scripts.result()
+            if rc != 0:
+                print("[STEP2] ERROR: dependency install failed")
+                return 1
+            if not tooling_ok:
+                mark_bootstrap_ok(layout.venv)  # the install above upgraded pip/setuptools/wheel
+
+            if layout.system or needs_import_check():
+                verify_stack(layout, env)
+            write_if_changed(layout.state_dir / INSTALL_STAMP_NAME, install_digest(layout))
+
+        print(f"[STEP2] Backend {'system Python' if layout.system else 'venv'} ready: {layout.venv}")
+        print(f"[STEP2] Requirements installed from: {layout.reqs}")
 
         if args.start_now:
-            start_flask_detached(backend, venv_path, env, host="127.0.0.1", port=5000)
+            start_flask_detached(layout, env, host="127.0.0.1", port=5000)
 
         print("[STEP2] Python Env Bootloader: SUCCESS")
         return 0
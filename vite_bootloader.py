@@ -17,21 +17,26 @@ Usage:
 """
 
 from __future__ import annotations
-import os, sys, subprocess, shutil, argparse, json, textwrap, time
+import os, subprocess, shutil, argparse, json, time, functools, hashlib
 from pathlib import Path
 from typing import Optional
 
 # -------------------- paths --------------------
 
+@functools.lru_cache(maxsize=1)
 def resolve_deployment_root() -> Path:
     core_dir = os.environ.get("VELA_CORE_DIR")
     if core_dir:
-        p = Path(core_dir).resolve()
-        try:
-            # …/data/.vela/cores/<vh> → deployment root
-            return p.parents[3]
-        except IndexError:
-            pass
+        # …/data/.vela/cores/<vh> → deployment root: four dirname hops on a str,
+        # abspath (no realpath stats); reaching the fs root early means "too shallow"
+        p = os.path.abspath(core_dir)
+        for _ in range(4):
+            parent = os.path.dirname(p)
+            if parent == p:
+                break
+            p = parent
+        else:
+            return Path(p)
     return Path.cwd().resolve()
 
 # -------------------- npm / Node helpers --------------------
@@ -71,8 +76,9 @@ def _quiet_run(pm_cmd: list[str]) -> bool:
             CREATE_NEW_PROCESS_GROUP = 0x00000200
             CREATE_NO_WINDOW = 0x08000000
             flags = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
-        res = subprocess.run(pm_cmd, text=True, capture_output=True, creationflags=flags if os.name=="nt" else 0)
-        return res.returncode == 0
+        rc = subprocess.call(pm_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                             creationflags=flags if os.name=="nt" else 0)
+        return rc == 0
     except Exception:
         return False
 
@@ -120,6 +126,97 @@ def ensure_npm(auto_install: bool, preferred_pm: Optional[str]) -> Optional[str]
     print("[VITE] npm not found. Install Node.js to enable frontend.")
     return None
 
+# -------------------- scaffold templates (flush-left literals: no dedent at runtime) --------------------
+
+_INDEX_HTML_SRC = """\
+<!doctype html>
+<html>
+  <head>
+    <meta charset="UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <title>VelaOS • Frontend</title>
+    <style>
+      :root { color-scheme: light dark; }
+      body { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; margin: 0; }
+      .banner { padding: 16px 20px; background: #0a0a0a; color: #fff; }
+      .container { padding: 24px; }
+      .health { font-size: 14px; opacity: .85; }
+      code { font-family: ui-monospace, SFMono-Regular, Menlo, Consolas, monospace; }
+    </style>
+  </head>
+  <body>
+    <div class="banner">
+      <strong>VelaOS</strong> • React + Vite (proxy → Flask @ <code>http://127.0.0.1:5000</code>)
+    </div>
+    <div class="container">
+      <div id="health-preflight" class="health">preflight: checking <code>/api/health</code>…</div>
+      <div id="root" style="margin-top:14px;"></div>
+    </div>
+
+    <script>
+      (async () => {
+        const el = document.getElementById('health-preflight');
+        try {
+          const r = await fetch('/api/health', {headers:{'Accept':'application/json'}});
+          const j = await r.json();
+          el.textContent = 'preflight: ' + JSON.stringify(j);
+        } catch (e) {
+          el.textContent = 'preflight: unreachable';
+        }
+      })();
+    </script>
+
+    <script type="module" src="/src/main.jsx"></script>
+  </body>
+</html>
+"""
+
+_MAIN_JSX_SRC = """\
+import React from "react";
+import { createRoot } from "react-dom/client";
+import App from "./App.jsx";
+
+const root = createRoot(document.getElementById("root"));
+root.render(<App />);
+"""
+
+_APP_JSX_SRC = """\
+import React, { useEffect, useState } from "react";
+
+export default function App() {
+  const [health, setHealth] = useState(null);
+  useEffect(() => {
+    fetch("/api/health")
+      .then(r => r.json())
+      .then(setHealth)
+      .catch(() => setHealth({ status: "unreachable" }));
+  }, []);
+  return (
+    <div>
+      <h1 style={{margin:"8px 0"}}>Vite + Flask</h1>
+      <p>React fetch: {health ? JSON.stringify(health) : "loading..."}</p>
+    </div>
+  );
+}
+"""
+
+_VITE_CONFIG_SRC = """\
+import { defineConfig } from "vite";
+import react from "@vitejs/plugin-react";
+
+export default defineConfig({
+  plugins: [react()],
+  server: {
+    host: "127.0.0.1",
+    port: 5173,
+    proxy: {
+      "/api":       { target: "http://127.0.0.1:5000", changeOrigin: true },
+      "/socket.io": { target: "http://127.0.0.1:5000", ws: true, changeOrigin: true }
+    }
+  }
+});
+"""
+
 # -------------------- scaffolding --------------------
 
 def ensure_frontend(root: Path) -> Path:
@@ -152,365 +249,295 @@ def ensure_frontend(root: Path) -> Path:
     # Branded root HTML with a visible preflight health check (before React)
     index_html = fe / "index.html"
     if not index_html.exists():
-        index_html.write_text(
-            textwrap.dedent("""\
-                <!doctype html>
-                <html>
-                  <head>
-                    <meta charset="UTF-8" />
-                    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
-                    <title>VelaOS • Frontend</title>
-                    <style>
-                      :root { color-scheme: light dark; }
-                      body { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; margin: 0; }
-                      .banner { padding: 16px 20px; background: #0a0a0a; color: #fff; }
-                      .container { padding: 24px; }
-                      .health { font-size: 14px; opacity: .85; }
-                      code { font-family: ui-monospace, SFMono-Regular, Menlo, Consolas, monospace; }
-                    </style>
-                  </head>
-                  <body>
-                    <div class="banner">
-                      <strong>VelaOS</strong> • React + Vite (proxy → Flask @ <code>http://127.0.0.1:5000</code>)
-                    </div>
-                    <div class="container">
-                      <div id="health-preflight" class="health">preflight: checking <code>/api/health</code>…</div>
-                      <div id="root" style="margin-top:14px;"></div>
-                    </div>
-
-                    <script>
-                      (async () => {
-                        const el = document.getElementById('health-preflight');
-                        try {
-                          const r = await fetch('/api/health', {headers:{'Accept':'application/json'}});
-                          const j = await r.json();
-                          el.textContent = 'preflight: ' + JSON.stringify(j);
-                        } catch (e) {
-                          el.textContent = 'preflight: unreachable';
-                        }
-                      })();
-                    </script>
-
-                    <script type="module" src="/src/main.jsx"></script>
-                  </body>
-                </html>
-            """),
-            encoding="utf-8",
-        )
+        index_html.write_text(_INDEX_HTML_SRC, encoding="utf-8")
 
     main_jsx = fe / "src" / "main.jsx"
     if not main_jsx.exists():
-        main_jsx.write_text(
-            textwrap.dedent("""\
-                import React from "react";
-                import { createRoot } from "react-dom/client";
-                import App from "./App.jsx";
-
-                const root = createRoot(document.getElementById("root"));
-                root.render(<App />);
-            """),
-            encoding="utf-8",
-        )
+        main_jsx.write_text(_MAIN_JSX_SRC, encoding="utf-8")
 
     app_jsx = fe / "src" / "App.jsx"
     if not app_jsx.exists():
-        app_jsx.write_text(
-            textwrap.dedent("""\
-                import React, { useEffect, useState } from "react";
-
-                export default function App() {
-                  const [health, setHealth] = useState(null);
-                  useEffect(() => {
-                    fetch("/api/health")
-                      .then(r => r.json())
-                      .then(setHealth)
-                      .catch(() => setHealth({ status: "unreachable" }));
-                  }, []);
-                  return (
-                    <div>
-                      <h1 style={{margin:"8px 0"}}>Vite + Flask</h1>
-                      <p>React fetch: {health ? JSON.stringify(health) : "loading..."}</p>
-                    </div>
-                  );
-                }
-            """),
-            encoding="utf-8",
-        )
+        app_jsx.write_text(_APP_JSX_SRC, encoding="utf-8")
 
     vite_cfg = fe / "vite.config.js"
     if not vite_cfg.exists():
-        vite_cfg.write_text(
-            textwrap.dedent("""\
-                import { defineConfig } from "vite";
-                import react from "@vitejs/plugin-react";
-
-                export default defineConfig({
-                  plugins: [react()],
-                  server: {
-                    host: "127.0.0.1",
-                    port: 5173,
-                    proxy: {
-                      "/api":       { target: "http://127.0.0.1:5000", changeOrigin: true },
-                      "/socket.io": { target: "http://127.0.0.1:5000", ws: true, changeOrigin: true }
-                    }
-                  }
-                });
-            """),
-            encoding="utf-8",
-        )
+        vite_cfg.write_text(_VITE_CONFIG_SRC, encoding="utf-8")
     return fe
 
-# -------------------- install & start --------------------
+# -------------------- generated scripts (flush-left literals: no dedent at runtime) --------------------
 
-def npm_install(fe_dir: Path, npm_cmd: Optional[str]) -> None:
-    if not npm_cmd:
-        print("[VITE] Skipping npm install (npm not available).")
-        return
+HASH_TAG = "# VELA_HASH="
+
+def _stamp(src: str) -> bytes:
+    """Encode once at import, with a content hash on line 2 (after the shebang)
+    so write_script can tell a current file from its first ~80 bytes."""
+    shebang, rest = src.split("\n", 1)
+    return f"{shebang}\n{HASH_TAG}{hashlib.sha1(src.encode('utf-8')).hexdigest()}\n{rest}".encode("utf-8")
+
+def write_script(path: Path, data: bytes) -> bool:
+    """Write a _stamp()ed script unless the file already carries the same header.
+    Raw os.write of the precomputed bytes: no text layer (and no CRLF translation
+    on Windows, which would defeat the header compare). Returns True if written."""
+    head = data[: data.index(b"\n", data.index(b"\n") + 1) + 1]
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(head)) == head:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)  # never leaves a half-written script behind
+    return True
+
+_START_SERVER_SRC = """\
+#!/usr/bin/env python3
+import os, sys, subprocess, time, shutil
+from pathlib import Path
+
+def pid_alive(pid: int) -> bool:
+    try:
+        if os.name == "nt":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            PROCESS_QUERY_LIMITED_INFORMATION, STILL_ACTIVE = 0x1000, 259
+            h = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+            if not h:
+                return False
+            try:
+                code = ctypes.c_ulong()
+                # an exited-but-unreaped pid still opens: ask for its exit code
+                return bool(kernel32.GetExitCodeProcess(h, ctypes.byref(code))) and code.value == STILL_ACTIVE
+            finally:
+                kernel32.CloseHandle(h)
+        else:
+            os.kill(pid, 0)
+            return True
+    except Exception:
+        return False
+
+def find_npm() -> str | None:
+    p = shutil.which("npm")
+    if p: return p
+    if os.name == "nt":
+        candidates = [
+            Path(os.environ.get("ProgramFiles", r"C:\\Program Files")) / "nodejs" / "npm.cmd",
+            Path(os.environ.get("ProgramFiles(x86)", r"C:\\Program Files (x86)")) / "nodejs" / "npm.cmd",
+            Path(os.environ.get("LocalAppData", r"C:\\Users\\%USERNAME%\\AppData\\Local")) / "Programs" / "node" / "npm.cmd",
+        ]
+        nvm_home = os.environ.get("NVM_HOME")
+        if nvm_home:
+            candidates.append(Path(nvm_home) / "npm.cmd")
+        for c in candidates:
+            if c.exists():
+                return str(c)
+    else:
+        for c in ("/opt/homebrew/bin/npm", "/usr/local/bin/npm", "/usr/bin/npm"):
+            if Path(c).exists():
+                return c
+    return None
+
+def start_flask(root: Path, follow: bool = True) -> int:
+    backend = root / "backend"
+    run_dir = root / ".vela-run"; run_dir.mkdir(exist_ok=True)
+    pid_file = run_dir / "flask.pid"
+
+    try:
+        old = int(pid_file.read_bytes())
+    except (OSError, ValueError):
+        old = None
+    if old and pid_alive(old):
+        print(f"[start] Flask already running (pid={old})"); return old
+
+    venv = backend / ".venv"
+    python_exe = venv / ("Scripts/python.exe" if os.name == "nt" else "bin/python")
+    if not python_exe.exists():
+        python_exe = Path(sys.executable)
 
     env = os.environ.copy()
-    # keep output flowing
-    env.setdefault("npm_config_loglevel", "info")
-    env.setdefault("npm_config_progress", "true")
-    env.setdefault("npm_config_fund", "false")
-    env.setdefault("npm_config_audit", "false")
+    env["FLASK_APP"] = "app.main:create_app"
+    env["PYTHONPATH"] = str(backend)
+    env.setdefault("FLASK_RUN_HOST", "127.0.0.1")
+    env.setdefault("FLASK_RUN_PORT", "5000")
 
-    label = "npm"
-    print(f"[{label}] exec: {npm_cmd} install (cwd={fe_dir})", flush=True)
+    cmd = [str(python_exe), "-m", "flask", "run",
+           "--host", env["FLASK_RUN_HOST"], "--port", env["FLASK_RUN_PORT"]]
 
-    creationflags = 0
+    kwargs = dict(cwd=str(backend), env=env)
+    if follow:
+        kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    else:  # nobody will drain a pipe: don't let the server block on (or die from) one
+        kwargs.update(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     if os.name == "nt":
-        # New group + no extra window. Intentionally NOT detached (we want streaming IO).
         CREATE_NEW_PROCESS_GROUP = 0x00000200
         CREATE_NO_WINDOW = 0x08000000
-        creationflags = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
+        kwargs["creationflags"] = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
+    else:
+        kwargs["start_new_session"] = True
 
-    p = subprocess.Popen(
-        [npm_cmd, "install"],
-        cwd=str(fe_dir),
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        shell=False,
-        creationflags=creationflags
-    )
-    assert p.stdout is not None
+    proc = subprocess.Popen(cmd, **kwargs)
+    pid_file.write_bytes(b"%d" % proc.pid)
+    print(f"[start] Flask (pid={proc.pid}) http://{env['FLASK_RUN_HOST']}:{env['FLASK_RUN_PORT']}")
+    if not follow:
+        return proc.pid
     try:
-        for line in iter(p.stdout.readline, ""):
-            print(f"[{label}] {line.rstrip()}", flush=True)
-    finally:
-        p.stdout.close()
-    rc = p.wait()
-    print(f"[{label}] exit code: {rc}", flush=True)
-    if rc != 0:
-        raise SystemError("npm install failed")
+        for _ in range(10):
+            line = proc.stdout.readline()
+            if not line: break
+            sys.stdout.write(line); sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    return proc.pid
 
-def write_combined_start_stop(root: Path) -> None:
-    run_dir = root / ".vela-run"; run_dir.mkdir(exist_ok=True)
-    start_py = root / "start_server.py"
-    stop_py  = root / "stop_servers.py"
+def start_vite(root: Path, follow: bool = True) -> int | None:
+    fe = root / "frontend"
+    if not (fe / "package.json").exists():
+        return None
+    run_dir = root / ".vela-run"
+    pid_file = run_dir / "vite.pid"
 
-    start_py.write_text(
-        textwrap.dedent("""\
-            #!/usr/bin/env python3
-            import os, sys, subprocess, time, shutil
-            from pathlib import Path
-
-            def pid_alive(pid: int) -> bool:
-                try:
-                    if os.name == "nt":
-                        out = subprocess.run(["tasklist", "/FI", f"PID eq {pid}"],
-                                             capture_output=True, text=True)
-                        return str(pid) in out.stdout
-                    else:
-                        os.kill(pid, 0)
-                        return True
-                except Exception:
-                    return False
-
-            def find_npm() -> str | None:
-                p = shutil.which("npm")
-                if p: return p
-                if os.name == "nt":
-                    candidates = [
-                        Path(os.environ.get("ProgramFiles", r"C:\\Program Files")) / "nodejs" / "npm.cmd",
-                        Path(os.environ.get("ProgramFiles(x86)", r"C:\\Program Files (x86)")) / "nodejs" / "npm.cmd",
-                        Path(os.environ.get("LocalAppData", r"C:\\Users\\%USERNAME%\\AppData\\Local")) / "Programs" / "node" / "npm.cmd",
-                    ]
-                    nvm_home = os.environ.get("NVM_HOME")
-                    if nvm_home:
-                        candidates.append(Path(nvm_home) / "npm.cmd")
-                    for c in candidates:
-                        if c.exists():
-                            return str(c)
-                else:
-                    for c in ("/opt/homebrew/bin/npm", "/usr/local/bin/npm", "/usr/bin/npm"):
-                        if Path(c).exists():
-                            return c
-                return None
-
-            def start_flask(root: Path) -> int:
-                backend = root / "backend"
-                run_dir = root / ".vela-run"; run_dir.mkdir(exist_ok=True)
-                pid_file = run_dir / "flask.pid"
-
-                if pid_file.exists():
-                    try:
-                        old = int(pid_file.read_text().strip())
-                    except Exception:
-                        old = None
-                    if old and not pid_alive(old):
-                        pid_file.unlink(missing_ok=True)
-                    elif old:
-                        print(f"[start] Flask already running (pid={old})"); return old
-
-                venv = backend / ".venv"
-                python_exe = venv / ("Scripts/python.exe" if os.name == "nt" else "bin/python")
-                if not python_exe.exists():
-                    python_exe = Path(sys.executable)
-
-                env = os.environ.copy()
-                env["FLASK_APP"] = "app.main:create_app"
-                env["PYTHONPATH"] = str(backend)
-                env.setdefault("FLASK_RUN_HOST", "127.0.0.1")
-                env.setdefault("FLASK_RUN_PORT", "5000")
-
-                cmd = [str(python_exe), "-m", "flask", "run",
-                       "--host", env["FLASK_RUN_HOST"], "--port", env["FLASK_RUN_PORT"]]
-
-                kwargs = dict(cwd=str(backend), env=env,
-                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-                if os.name == "nt":
-                    CREATE_NEW_PROCESS_GROUP = 0x00000200
-                    CREATE_NO_WINDOW = 0x08000000
-                    kwargs["creationflags"] = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
-                else:
-                    kwargs["preexec_fn"] = os.setpgrp
-
-                proc = subprocess.Popen(cmd, **kwargs)
-                pid_file.write_text(str(proc.pid), encoding="utf-8")
-                print(f"[start] Flask (pid={proc.pid}) http://{env['FLASK_RUN_HOST']}:{env['FLASK_RUN_PORT']}")
-                try:
-                    for _ in range(10):
-                        line = proc.stdout.readline()
-                        if not line: break
-                        sys.stdout.write(line); sys.stdout.flush()
-                except KeyboardInterrupt:
-                    pass
-                return proc.pid
-
-            def start_vite(root: Path) -> int | None:
-                fe = root / "frontend"
-                if not (fe / "package.json").exists():
-                    return None
-                run_dir = root / ".vela-run"
-                pid_file = run_dir / "vite.pid"
-
-                if pid_file.exists():
-                    try:
-                        old = int(pid_file.read_text().strip())
-                    except Exception:
-                        old = None
-                    if old and not pid_alive(old):
-                        pid_file.unlink(missing_ok=True)
-                    elif old:
-                        print(f"[start] Vite already running (pid={old})"); return old
-
-                npm_cmd = find_npm()
-                if not npm_cmd:
-                    print("[start] npm not found; skipping Vite.")
-                    return None
-
-                cmd = [npm_cmd, "run", "dev"]
-                kwargs = dict(cwd=str(fe),
-                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-                if os.name == "nt":
-                    CREATE_NEW_PROCESS_GROUP = 0x00000200
-                    CREATE_NO_WINDOW = 0x08000000
-                    kwargs["creationflags"] = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
-                else:
-                    kwargs["preexec_fn"] = os.setpgrp
-
-                proc = subprocess.Popen(cmd, **kwargs)
-                pid_file.write_text(str(proc.pid), encoding="utf-8")
-                print(f"[start] Vite (pid={proc.pid}) http://127.0.0.1:5173")
-                try:
-                    for _ in range(10):
-                        line = proc.stdout.readline()
-                        if not line: break
-                        sys.stdout.write(line); sys.stdout.flush()
-                except KeyboardInterrupt:
-                    pass
-                return proc.pid
-
-            def main():
-                root = Path(__file__).resolve().parent
-                fp = start_flask(root)
-                vp = start_vite(root)
-                print("[start] Done.")
-                return 0
-
-            if __name__ == "__main__":
-                sys.exit(main())
-        """),
-        encoding="utf-8",
-    )
+    try:
+        old = int(pid_file.read_bytes())
+    except (OSError, ValueError):
+        old = None
+    if old and pid_alive(old):
+        print(f"[start] Vite already running (pid={old})"); return old
 
-    stop_py.write_text(
-        textwrap.dedent("""\
-            #!/usr/bin/env python3
-            import os, sys, time, signal, subprocess
-            from pathlib import Path
-
-            def kill_tree_windows(pid: int) -> None:
-                subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"],
-                               capture_output=True, text=True)
-
-            def stop_pid(pid_file: Path, label: str) -> None:
-                if not pid_file.exists():
-                    print(f"[stop] No {label} pid file.")
-                    return
-                try:
-                    pid = int(pid_file.read_text().strip())
-                except Exception:
-                    print(f"[stop] Invalid {label} pid file.")
-                    pid_file.unlink(missing_ok=True)
-                    return
-                print(f"[stop] Stopping {label} pid={pid}...")
-                if os.name == "nt":
-                    kill_tree_windows(pid)
-                else:
-                    try:
-                        os.kill(pid, signal.SIGTERM)
-                    except ProcessLookupError:
-                        pass
-                time.sleep(0.5)
-                pid_file.unlink(missing_ok=True)
-                print(f"[stop] {label} stopped.")
-
-            def main():
-                root = Path(__file__).resolve().parent
-                run_dir = root / ".vela-run"
-                stop_pid(run_dir / "vite.pid", "Vite")
-                stop_pid(run_dir / "flask.pid", "Flask")
-                print("[stop] Done.")
-                return 0
-
-            if __name__ == "__main__":
-                sys.exit(main())
-        """),
-        encoding="utf-8",
-    )
+    npm_cmd = find_npm()
+    if not npm_cmd:
+        print("[start] npm not found; skipping Vite.")
+        return None
 
-def write_vite_scripts(root: Path) -> None:
+    cmd = [npm_cmd, "run", "dev"]
+    kwargs = dict(cwd=str(fe))
+    if follow:
+        kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    else:
+        kwargs.update(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if os.name == "nt":
+        CREATE_NEW_PROCESS_GROUP = 0x00000200
+        CREATE_NO_WINDOW = 0x08000000
+        kwargs["creationflags"] = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
+    else:
+        kwargs["start_new_session"] = True
+
+    proc = subprocess.Popen(cmd, **kwargs)
+    pid_file.write_bytes(b"%d" % proc.pid)
+    print(f"[start] Vite (pid={proc.pid}) http://127.0.0.1:5173")
+    if not follow:
+        return proc.pid
+    try:
+        for _ in range(10):
+            line = proc.stdout.readline()
+            if not line: break
+            sys.stdout.write(line); sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    return proc.pid
+
+def main():
+    root = Path(__file__).resolve().parent
+    fp = start_flask(root)
+    vp = start_vite(root)
+    print("[start] Done.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+"""
+
+_STOP_SERVERS_SRC = """\
+#!/usr/bin/env python3
+import os, sys, time, signal, subprocess
+from pathlib import Path
+
+def pid_alive(pid: int) -> bool:
+    try:
+        if os.name == "nt":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            PROCESS_QUERY_LIMITED_INFORMATION, STILL_ACTIVE = 0x1000, 259
+            h = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+            if not h:
+                return False
+            try:
+                code = ctypes.c_ulong()
+                # an exited-but-unreaped pid still opens: ask for its exit code
+                return bool(kernel32.GetExitCodeProcess(h, ctypes.byref(code))) and code.value == STILL_ACTIVE
+            finally:
+                kernel32.CloseHandle(h)
+        else:
+            os.kill(pid, 0)
+            return True
+    except Exception:
+        return False
+
+def kill_tree_windows(pid: int) -> None:
+    subprocess.call(["taskkill", "/PID", str(pid), "/T", "/F"],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def terminate_windows(pid: int) -> bool:
+    # TerminateProcess on one known pid: a syscall instead of spawning taskkill
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    PROCESS_TERMINATE = 0x0001
+    h = kernel32.OpenProcess(PROCESS_TERMINATE, False, pid)
+    if not h:
+        return False
+    try:
+        return bool(kernel32.TerminateProcess(h, 1))
+    finally:
+        kernel32.CloseHandle(h)
+
+def stop_pid(pid_file: Path, label: str, tree: bool = False) -> None:
+    if not pid_file.exists():
+        print(f"[stop] No {label} pid file.")
+        return
+    try:
+        pid = int(pid_file.read_bytes())
+    except Exception:
+        print(f"[stop] Invalid {label} pid file.")
+        pid_file.unlink(missing_ok=True)
+        return
+    if not pid_alive(pid):
+        print(f"[stop] {label} pid={pid} not running; clearing stale pid file.")
+        pid_file.unlink(missing_ok=True)
+        return
+    print(f"[stop] Stopping {label} pid={pid}...")
+    if os.name == "nt":
+        # Flask is a single process; npm (Vite) has node children and needs /T.
+        # VELA_KILL_TREE=1 restores the old taskkill /T behaviour everywhere.
+        if tree or os.environ.get("VELA_KILL_TREE") == "1" or not terminate_windows(pid):
+            kill_tree_windows(pid)
+    else:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for _ in range(10):
+        if not pid_alive(pid):
+            break
+        time.sleep(0.05)
+    pid_file.unlink(missing_ok=True)
+    print(f"[stop] {label} stopped.")
+
+def main():
+    root = Path(__file__).resolve().parent
     run_dir = root / ".vela-run"
-    run_dir.mkdir(exist_ok=True)
+    stop_pid(run_dir / "vite.pid", "Vite", tree=True)
+    stop_pid(run_dir / "flask.pid", "Flask")
+    print("[stop] Done.")
+    return 0
 
-    start_vite = root / "start_vite.py"
-    stop_vite  = root / "stop_vite.py"
+if __name__ == "__main__":
+    sys.exit(main())
+"""
 
-    start_vite.write_text(r"""#!/usr/bin/env python3
+_START_VITE_SRC = r"""#!/usr/bin/env python3
 import os, shutil, subprocess, time
 from pathlib import Path
 
@@ -522,8 +549,18 @@ PIDF = RUN / "vite.pid"
 def pid_alive(pid: int) -> bool:
     try:
         if os.name == "nt":
-            out = subprocess.run(["tasklist", "/FI", f"PID eq {pid}"], capture_output=True, text=True)
-            return str(pid) in out.stdout
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            PROCESS_QUERY_LIMITED_INFORMATION, STILL_ACTIVE = 0x1000, 259
+            h = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+            if not h:
+                return False
+            try:
+                code = ctypes.c_ulong()
+                # an exited-but-unreaped pid still opens: ask for its exit code
+                return bool(kernel32.GetExitCodeProcess(h, ctypes.byref(code))) and code.value == STILL_ACTIVE
+            finally:
+                kernel32.CloseHandle(h)
         else:
             os.kill(pid, 0)
             return True
@@ -531,16 +568,15 @@ def pid_alive(pid: int) -> bool:
         return False
 
 def read_pid():
-    try:
-        if PIDF.exists():
-            p = int(PIDF.read_text().strip())
-            if pid_alive(p): return p
-    except Exception:
+    try:  # one read, no exists() pre-check: a missing file is just OSError
+        p = int(PIDF.read_bytes())
+        if pid_alive(p): return p
+    except (OSError, ValueError):
         pass
     return None
 
 def write_pid(pid: int):
-    PIDF.write_text(str(pid), encoding="utf-8")
+    PIDF.write_bytes(b"%d" % pid)
 
 def find_npm() -> str | None:
     p = shutil.which("npm")
@@ -605,7 +641,7 @@ def start(detached: bool = True):
             CREATE_NO_WINDOW = 0x08000000
             kwargs["creationflags"] = DETACHED_PROCESS | CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
         else:
-            kwargs["preexec_fn"] = os.setpgrp
+            kwargs["start_new_session"] = True
         kwargs.update(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     else:
         kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
@@ -617,9 +653,9 @@ def start(detached: bool = True):
 
 if __name__ == "__main__":
     start(detached=True)
-""", encoding="utf-8")
+"""
 
-    stop_vite.write_text(r"""#!/usr/bin/env python3
+_STOP_VITE_SRC = r"""#!/usr/bin/env python3
 import os, subprocess
 from pathlib import Path
 
@@ -640,7 +676,7 @@ def kill(pid: int):
 if __name__ == "__main__":
     if PIDF.exists():
         try:
-            pid = int(PIDF.read_text().strip())
+            pid = int(PIDF.read_bytes())
             print(f"[vite] stopping pid={pid} …")
             kill(pid)
         except Exception:
@@ -648,7 +684,76 @@ if __name__ == "__main__":
         PIDF.unlink(missing_ok=True)
     else:
         print("[vite] no pid file")
-""", encoding="utf-8")
+"""
+
+_START_SERVER_BYTES, _STOP_SERVERS_BYTES, _START_VITE_BYTES, _STOP_VITE_BYTES = map(
+    _stamp, (_START_SERVER_SRC, _STOP_SERVERS_SRC, _START_VITE_SRC, _STOP_VITE_SRC))
+
+# -------------------- install & start --------------------
+
+def npm_install(fe_dir: Path, npm_cmd: Optional[str]) -> None:
+    if not npm_cmd:
+        print("[VITE] Skipping npm install (npm not available).")
+        return
+
+    env = os.environ.copy()
+    # keep output flowing
+    env.setdefault("npm_config_loglevel", "info")
+    env.setdefault("npm_config_progress", "true")
+    env.setdefault("npm_config_fund", "false")
+    env.setdefault("npm_config_audit", "false")
+
+    label = "npm"
+    print(f"[{label}] exec: {npm_cmd} install (cwd={fe_dir})", flush=True)
+
+    creationflags = 0
+    if os.name == "nt":
+        # New group + no extra window. Intentionally NOT detached (we want streaming IO).
+        CREATE_NEW_PROCESS_GROUP = 0x00000200
+        CREATE_NO_WINDOW = 0x08000000
+        creationflags = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
+
+    p = subprocess.Popen(
+        [npm_cmd, "install"],
+        cwd=str(fe_dir),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        shell=False,
+        creationflags=creationflags
+    )
+    assert p.stdout is not None
+    try:
+        for line in iter(p.stdout.readline, ""):
+            print(f"[{label}] {line.rstrip()}", flush=True)
+    finally:
+        p.stdout.close()
+    rc = p.wait()
+    print(f"[{label}] exit code: {rc}", flush=True)
+    if rc != 0:
+        raise SystemError("npm install failed")
+
+def write_combined_start_stop(root: Path) -> None:
+    run_dir = root / ".vela-run"; run_dir.mkdir(exist_ok=True)
+    start_py = root / "start_server.py"
+    stop_py  = root / "stop_servers.py"
+
+    write_script(start_py, _START_SERVER_BYTES)
+
+    write_script(stop_py, _STOP_SERVERS_BYTES)
+
+def write_vite_scripts(root: Path) -> None:
+    run_dir = root / ".vela-run"
+    run_dir.mkdir(exist_ok=True)
+
+    start_vite = root / "start_vite.py"
+    stop_vite  = root / "stop_vite.py"
+
+    write_script(start_vite, _START_VITE_BYTES)
+
+    write_script(stop_vite, _STOP_VITE_BYTES)
 
     for f in (start_vite, stop_vite):
         try: os.chmod(f, 0o755)
@@ -656,20 +761,17 @@ if __name__ == "__main__":
 
 
 def start_now_detached(root: Path) -> None:
-    """Launch start_server.py detached so the bootloader can finish."""
-    start_py = root / "start_server.py"
-    py = sys.executable
-    kwargs = dict(cwd=str(root),
-                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    if os.name == "nt":
-        CREATE_NEW_PROCESS_GROUP = 0x00000200
-        CREATE_NO_WINDOW = 0x08000000
-        kwargs["creationflags"] = CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW
-    else:
-        kwargs["preexec_fn"] = os.setpgrp
+    """Start Flask and Vite straight from this process using start_server.py's own
+    helpers (imported, not executed): no middle interpreter between us and the
+    servers, which are still detached into their own session / process group."""
+    import importlib.util
     try:
-        subprocess.Popen([py, str(start_py)], **kwargs)
-        print("[VITE] start_server.py launched (detached).")
+        spec = importlib.util.spec_from_file_location("start_server", root / "start_server.py")
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        mod.start_flask(root, follow=False)
+        mod.start_vite(root, follow=False)
+        print("[VITE] servers launched (detached).")
     except Exception as e:
         print(f"[VITE] WARN: could not start servers automatically: {e}")
 